@@ -0,0 +1,21 @@
+import pytest
+
+from tofipa import __project_name__, __version__, _cli
+
+
+@pytest.mark.parametrize(
+    argnames='args, exp_parse_args_called',
+    argvalues=(
+        (['--version'], False),
+        (['--version', 'foo.torrent'], True),
+        (['foo.torrent', '--version'], True),
+    ),
+    ids=lambda v: str(v),
+)
+def test_cli_version(args, exp_parse_args_called, mocker, capsys):
+    parse_args_mock = mocker.patch('tofipa._cli._parse_args', wraps=_cli._parse_args)
+    with pytest.raises(SystemExit) as exc_info:
+        _cli.cli(args)
+    assert exc_info.value.code == 0
+    assert capsys.readouterr() == (f'{__project_name__} {__version__}\n', '')
+    assert parse_args_mock.called is exp_parse_args_called
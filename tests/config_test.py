@@ -1,10 +1,17 @@
 import os
+from unittest.mock import MagicMock, Mock, call
 
 import pytest
 
 from tofipa import _config, _errors
 
 
+def make_dir_entry(path, is_dir):
+    entry = Mock(path=path, is_dir=Mock(return_value=is_dir))
+    entry.configure_mock(name=os.path.basename(path))
+    return entry
+
+
 def test_Locations_locations(mocker):
     mocker.patch('tofipa._config.Locations._read', return_value=['baz'])
 
@@ -95,6 +102,27 @@ def test_Locations_normalize_expands_subdirectories(mocker, tmp_path):
     ]
 
 
+def test_Locations_normalize_expands_subdirectories_with_symlinks(mocker, tmp_path):
+    parent_directory = tmp_path / 'parent'
+    parent_directory.mkdir()
+    (parent_directory / 'subdir').mkdir()
+    (parent_directory / 'file').write_text('foo')
+    (parent_directory / 'subdir_link').symlink_to(parent_directory / 'subdir')
+    (parent_directory / 'file_link').symlink_to(parent_directory / 'file')
+    (parent_directory / 'broken_link').symlink_to(parent_directory / 'nonexisting')
+
+    mocker.patch('tofipa._config.Locations._read')
+    filepath = 'mock/locations/file'
+    locations = _config.Locations(filepath=filepath)
+
+    return_value = locations._normalize(f'{parent_directory}{os.sep}*', filepath, 123)
+    assert return_value == [
+        str(parent_directory / 'broken_link'),
+        str(parent_directory / 'subdir'),
+        str(parent_directory / 'subdir_link'),
+    ]
+
+
 def test_Locations_normalize_handles_exception_from_subdirectories_expansion(mocker, tmp_path):
     parent_directory = tmp_path / 'parent'
     parent_directory.mkdir()
@@ -127,7 +155,13 @@ def test_Locations_normalize_resolves_environment_variables(with_subdir_expansio
     locations = _config.Locations(filepath=filepath)
 
     if with_subdir_expansion:
-        mocker.patch('os.listdir', return_value=('a', 'b', 'c'))
+        def scandir_mock(path):
+            return MagicMock(__enter__=Mock(return_value=[
+                make_dir_entry(f'{path}{os.sep}{name}', is_dir=False)
+                for name in ('a', 'b', 'c')
+            ]))
+
+        mocker.patch('os.scandir', side_effect=scandir_mock)
         return_value = locations._normalize(f'mock line{os.sep}*', filepath, 123)
         assert return_value == [
             f'resolved {filepath}@123: mock line{os.sep}a',
@@ -141,6 +175,25 @@ def test_Locations_normalize_resolves_environment_variables(with_subdir_expansio
         ]
 
 
+def test_Locations_normalize_expands_subdirectories_of_environment_variable(mocker, tmp_path):
+    parent_directory = tmp_path / 'parent'
+    parent_directory.mkdir()
+    (parent_directory / 'subdir1').mkdir()
+    (parent_directory / 'subdir2').mkdir()
+    (parent_directory / 'file1').write_text('foo')
+    mocker.patch.dict('os.environ', {'PARENT': str(parent_directory)})
+
+    mocker.patch('tofipa._config.Locations._read')
+    filepath = 'mock/locations/file'
+    locations = _config.Locations(filepath=filepath)
+
+    return_value = locations._normalize(f'$PARENT{os.sep}*', filepath, 123)
+    assert return_value == [
+        str(parent_directory / 'subdir1'),
+        str(parent_directory / 'subdir2'),
+    ]
+
+
 @pytest.mark.parametrize('with_subdir_expansion', (True, False), ids=('with subdir expansion', 'without subdir expansion'))
 def test_Locations_normalize_handles_subdir_being_file(with_subdir_expansion, mocker, tmp_path):
     mocker.patch('tofipa._config.Locations._read')
@@ -163,6 +216,26 @@ def test_Locations_normalize_handles_subdir_being_file(with_subdir_expansion, mo
             locations._normalize(str(line), filepath, 123)
 
 
+def test_Locations_is_existing_nondirectory(tmp_path):
+    (tmp_path / 'dir').mkdir()
+    (tmp_path / 'file').write_text('i am a file')
+    (tmp_path / 'dir_link').symlink_to(tmp_path / 'dir')
+    (tmp_path / 'file_link').symlink_to(tmp_path / 'file')
+    (tmp_path / 'broken_link').symlink_to(tmp_path / 'nonexisting')
+
+    for name, exp_result in (
+        ('dir', False),
+        ('file', True),
+        ('dir_link', False),
+        ('file_link', True),
+        ('broken_link', False),
+        ('nonexisting', False),
+    ):
+        path = str(tmp_path / name)
+        assert _config.Locations._is_existing_nondirectory(path) is exp_result
+        assert exp_result is (os.path.exists(path) and not os.path.isdir(path))
+
+
 def test_Locations_resolve_env_vars_resolves_tilde(mocker):
     mocker.patch('tofipa._config.Locations._read')
     mocker.patch('os.path.expanduser', return_value='path/with/expanded/tilde')
@@ -187,6 +260,17 @@ def test_Locations_resolve_env_vars_resolves_environment_variables(mocker):
     assert return_value == 'The Bar/Bar/BAR/The Foo/bar/The Bar'
 
 
+def test_Locations_resolve_env_vars_does_not_resolve_environment_variables_in_values(mocker):
+    mocker.patch('tofipa._config.Locations._read')
+    mocker.patch.dict('os.environ', {'FOO': 'The $FOO', 'bar': '$FOO'})
+
+    filepath = 'mock/locations/file'
+    locations = _config.Locations(filepath=filepath)
+
+    return_value = locations._resolve_env_vars('Foo/$FOO/foo/$bar', filepath, 123)
+    assert return_value == 'Foo/The $FOO/foo/$FOO'
+
+
 def test_Locations_resolve_env_vars_handles_unset_environment_variable(mocker):
     mocker.patch('tofipa._config.Locations._read')
     mocker.patch.dict('os.environ', {'FOO': 'The Foo', 'bar': 'The Bar'})
@@ -241,6 +325,40 @@ def test_Locations_normalizes_added_locations(mocker):
                          'normalized:more:None:None', 'normalized:paths:None:None']
 
 
+def test_Locations_extend_adds_all_normalized_locations(mocker):
+    mocker.patch('tofipa._config.Locations._read', return_value=['initial/path'])
+    mocker.patch('tofipa._config.Locations._normalize',
+                 side_effect=lambda line, fp, ln: (f'{line}/a', f'{line}/b'))
+
+    filepath = 'mock/locations/file'
+    locations = _config.Locations(filepath=filepath)
+    locations.extend(('foo', 'bar'))
+    assert locations == ['initial/path', 'foo/a', 'foo/b', 'bar/a', 'bar/b']
+    assert locations._normalize.call_args_list == [
+        call('foo', None, None),
+        call('bar', None, None),
+    ]
+
+
+def test_Locations_slice_assignment_adds_all_normalized_locations(mocker):
+    mocker.patch('tofipa._config.Locations._read', return_value=['x', 'y', 'z'])
+    mocker.patch('tofipa._config.Locations._normalize',
+                 side_effect=lambda line, fp, ln: [f'{line}/{i}' for i in range(int(line[-1]))])
+
+    filepath = 'mock/locations/file'
+    locations = _config.Locations(filepath=filepath)
+
+    locations[1:2] = ('a2', 'e0', 'b1')
+    assert locations == ['x', 'a2/0', 'a2/1', 'b1/0', 'z']
+
+    # Assigning one path to an index or inserting it only adds the first
+    # normalized path
+    locations[0] = 's3'
+    assert locations == ['s3/0', 'a2/0', 'a2/1', 'b1/0', 'z']
+    locations.insert(1, 'i2')
+    assert locations == ['s3/0', 'i2/0', 'a2/0', 'a2/1', 'b1/0', 'z']
+
+
 def test_Locations_equality(mocker):
     mocker.patch('tofipa._config.Locations._read', return_value=['initial/path'])
 
@@ -0,0 +1,30 @@
+import importlib
+
+import pytest
+
+import tofipa
+
+
+@pytest.mark.parametrize('name, module_name', tuple(tofipa._lazy_attributes.items()))
+def test_getattr_imports_lazy_attribute(name, module_name, monkeypatch):
+    # Remove cached value to make sure __getattr__() is called
+    monkeypatch.delitem(vars(tofipa), name, raising=False)
+    module = importlib.import_module(module_name, tofipa.__name__)
+    assert getattr(tofipa, name) is getattr(module, name)
+    # Value is cached
+    assert vars(tofipa)[name] is getattr(module, name)
+
+
+def test_getattr_raises_AttributeError_for_unknown_name():
+    with pytest.raises(AttributeError, match=r"^module 'tofipa' has no attribute 'foo'$"):
+        tofipa.foo
+
+
+def test_dir_lists_lazy_attributes(monkeypatch):
+    for name in tofipa._lazy_attributes:
+        monkeypatch.delitem(vars(tofipa), name, raising=False)
+    names = dir(tofipa)
+    for name in tofipa._lazy_attributes:
+        assert name in names
+    assert '__version__' in names
+    assert names == sorted(names)
@@ -1,14 +1,19 @@
 import collections
+import concurrent.futures
+import difflib
 import errno
+import logging
 import os
 import random
 import re
+import stat
 import string
-from unittest.mock import Mock, PropertyMock, call
+from unittest.mock import MagicMock, Mock, PropertyMock, call
 
 import pytest
 import torf
 
+import tofipa
 from tofipa import FindError, __project_name__
 from tofipa._location import FindDownloadLocation
 
@@ -37,6 +42,12 @@ def test_FindDownloadLocation_init_torrent_argument(torrent, exp_torrent_filepat
         ((), RuntimeError('You must provide at least one potential download location'), ()),
         # Locations are deduplicated after they're converted to str
         (['foo', 123, 'BAR', '123'], None, ('foo', '123', 'BAR')),
+        # Locations are deduplicated by their real path and kept as given
+        (
+            ['foo', f'foo{os.sep}', f'.{os.sep}foo', f'bar{os.sep}..{os.sep}foo', f'foo{os.sep}bar{os.sep}'],
+            None,
+            ('foo', f'foo{os.sep}bar{os.sep}'),
+        ),
     ),
 )
 def test_FindDownloadLocation_init_locations_argument(locations, exp_exception, exp_locations):
@@ -195,11 +206,14 @@ def test_FindDownloadLocation_get_download_location(linked_candidates, exp_downl
 
     fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
     mocker.patch.object(fdl, '_torrent', Mock(files=tuple(linked_candidates[0])))
+    fdl._torrent.configure_mock(name='My Torrent')
     mocker.patch.object(fdl, '_get_size_matching_candidates', return_value='mock size matches')
     mocker.patch.object(fdl, '_each_set_of_linked_candidates', return_value=linked_candidates)
     mocker.patch.object(fdl, '_create_hardlink')
+    TorrentFileStream_mock = mocker.patch('torf.TorrentFileStream')
+    tfs_mock = TorrentFileStream_mock.return_value.__enter__.return_value
 
-    def verify_file_mock(file, location):
+    def verify_file_mock(file, tfs, location):
         corrupt = corruptions[file].pop(0)
         print('verifying', file, location, corrupt)
         return corrupt == 'good'
@@ -212,22 +226,67 @@ def test_FindDownloadLocation_get_download_location(linked_candidates, exp_downl
     assert fdl._get_size_matching_candidates.call_args_list == [call()]
     assert fdl._each_set_of_linked_candidates.call_args_list == [call(fdl._get_size_matching_candidates.return_value)]
     assert fdl._verify_file.call_args_list == [
-        call(file, location=tempdir_name)
+        call(file, tfs=tfs_mock, location=tempdir_name)
         for file in exp_verified_files
     ]
+    # One TorrentFileStream per set of linked candidates
+    exp_content_path = os.path.join(tempdir_name, fdl._torrent.name)
+    assert TorrentFileStream_mock.call_args_list == [
+        call(fdl._torrent, content_path=exp_content_path)
+        for paths in linked_candidates
+        if 'ignored' not in paths
+    ]
     print(' links created:', sorted(fdl._create_hardlink.call_args_list))
     print('links expected:', sorted(exp_create_hardlink_calls))
     assert sorted(fdl._create_hardlink.call_args_list) == sorted(exp_create_hardlink_calls)
 
 
+def test_FindDownloadLocation_get_download_location_opens_stream_only_if_needed(mocker):
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    # "baz/3" never has any candidates, so iteration doesn't stop when the other
+    # files are found.
+    mocker.patch.object(fdl, '_torrent', Mock(files=('foo/1', 'bar/2', 'baz/3')))
+    fdl._torrent.configure_mock(name='My Torrent')
+    linked_candidates = [
+        {
+            'foo/1': {'filepath': 'x/1', 'location': 'a', 'temporary_location': 'tmp'},
+            'bar/2': {'filepath': 'y/2', 'location': 'b', 'temporary_location': 'tmp'},
+        },
+        {
+            'foo/1': {'filepath': 'x/1', 'location': 'a', 'temporary_location': 'tmp'},
+            'bar/2': {'filepath': 'y/2', 'location': 'b', 'temporary_location': 'tmp'},
+        },
+    ]
+    mocker.patch.object(fdl, '_get_size_matching_candidates', return_value='mock size matches')
+    mocker.patch.object(fdl, '_each_set_of_linked_candidates', return_value=linked_candidates)
+    mocker.patch.object(fdl, '_create_hardlink')
+    mocker.patch.object(fdl, '_verify_file', return_value=True)
+    TorrentFileStream_mock = mocker.patch('torf.TorrentFileStream')
+    tfs_mock = TorrentFileStream_mock.return_value.__enter__.return_value
+
+    assert fdl._get_download_location() == 'a'
+    assert fdl._verify_file.call_args_list == [
+        call('foo/1', tfs=tfs_mock, location='tmp'),
+        call('bar/2', tfs=tfs_mock, location='tmp'),
+    ]
+    # Every file in the second set is already found
+    assert TorrentFileStream_mock.call_args_list == [
+        call(fdl._torrent, content_path=os.path.join('tmp', 'My Torrent')),
+    ]
+    assert TorrentFileStream_mock.return_value.__exit__.call_count == 1
+
+
 def test_FindDownloadLocation_each_set_of_linked_candidates(mocker, tmp_path):
     fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
     tempdir = str(tmp_path / 'templinks')
-    mocker.patch.object(fdl, '_create_symlink')
-    mocker.patch.object(type(fdl), '_temporary_directory', PropertyMock(return_value=Mock(
+    mocks = Mock()
+    mocks.attach_mock(mocker.patch.object(fdl, '_create_symlink'), 'create_symlink')
+    mocks.attach_mock(mocker.patch.object(fdl, '_remove_symlink'), 'remove_symlink')
+    TemporaryDirectory_mock = Mock(
         __enter__=Mock(return_value=str(tempdir)),
-        __exit__=Mock(),
-    )))
+        __exit__=Mock(return_value=False),
+    )
+    mocker.patch.object(type(fdl), '_temporary_directory', PropertyMock(return_value=TemporaryDirectory_mock))
 
     candidates = {
         'a': [{'filepath': 'a1'}],
@@ -238,76 +297,111 @@ def test_FindDownloadLocation_each_set_of_linked_candidates(mocker, tmp_path):
         (
             # Linked files
             {'a': {'filepath': 'a1'}, 'b': {'filepath': 'b1'}, 'c': {'filepath': 'c1'}},
-            # fdl._create_symlink() calls
+            # Changed links
             [
-                call(os.path.abspath('a1'), os.path.join(tempdir, 'a')),
-                call(os.path.abspath('b1'), os.path.join(tempdir, 'b')),
-                call(os.path.abspath('c1'), os.path.join(tempdir, 'c')),
+                call.create_symlink(os.path.abspath('a1'), os.path.join(tempdir, 'a')),
+                call.create_symlink(os.path.abspath('b1'), os.path.join(tempdir, 'b')),
+                call.create_symlink(os.path.abspath('c1'), os.path.join(tempdir, 'c')),
             ],
         ),
         (
             # Linked files
             {'a': {'filepath': 'a1'}, 'b': {'filepath': 'b1'}, 'c': {'filepath': 'c2'}},
-            # fdl._create_symlink() calls
+            # Changed links
             [
-                call(os.path.abspath('a1'), os.path.join(tempdir, 'a')),
-                call(os.path.abspath('b1'), os.path.join(tempdir, 'b')),
-                call(os.path.abspath('c2'), os.path.join(tempdir, 'c')),
+                call.remove_symlink(os.path.join(tempdir, 'c')),
+                call.create_symlink(os.path.abspath('c2'), os.path.join(tempdir, 'c')),
             ],
         ),
         (
             # Linked files
             {'a': {'filepath': 'a1'}, 'b': {'filepath': 'b1'}, 'c': {'filepath': 'c3'}},
-            # fdl._create_symlink() calls
+            # Changed links
             [
-                call(os.path.abspath('a1'), os.path.join(tempdir, 'a')),
-                call(os.path.abspath('b1'), os.path.join(tempdir, 'b')),
-                call(os.path.abspath('c3'), os.path.join(tempdir, 'c')),
+                call.remove_symlink(os.path.join(tempdir, 'c')),
+                call.create_symlink(os.path.abspath('c3'), os.path.join(tempdir, 'c')),
             ],
         ),
         (
             # Linked files
             {'a': {'filepath': 'a1'}, 'b': {'filepath': 'b2'}, 'c': {'filepath': 'c1'}},
-            # fdl._create_symlink() calls
+            # Changed links
             [
-                call(os.path.abspath('a1'), os.path.join(tempdir, 'a')),
-                call(os.path.abspath('b2'), os.path.join(tempdir, 'b')),
-                call(os.path.abspath('c1'), os.path.join(tempdir, 'c')),
+                call.remove_symlink(os.path.join(tempdir, 'b')),
+                call.create_symlink(os.path.abspath('b2'), os.path.join(tempdir, 'b')),
+                call.remove_symlink(os.path.join(tempdir, 'c')),
+                call.create_symlink(os.path.abspath('c1'), os.path.join(tempdir, 'c')),
             ],
         ),
         (
             # Linked files
             {'a': {'filepath': 'a1'}, 'b': {'filepath': 'b2'}, 'c': {'filepath': 'c2'}},
-            # fdl._create_symlink() calls
+            # Changed links
             [
-                call(os.path.abspath('a1'), os.path.join(tempdir, 'a')),
-                call(os.path.abspath('b2'), os.path.join(tempdir, 'b')),
-                call(os.path.abspath('c2'), os.path.join(tempdir, 'c')),
+                call.remove_symlink(os.path.join(tempdir, 'c')),
+                call.create_symlink(os.path.abspath('c2'), os.path.join(tempdir, 'c')),
             ],
         ),
         (
             # Linked files
             {'a': {'filepath': 'a1'}, 'b': {'filepath': 'b2'}, 'c': {'filepath': 'c3'}},
-            # fdl._create_symlink() calls
+            # Changed links
             [
-                call(os.path.abspath('a1'), os.path.join(tempdir, 'a')),
-                call(os.path.abspath('b2'), os.path.join(tempdir, 'b')),
-                call(os.path.abspath('c3'), os.path.join(tempdir, 'c')),
+                call.remove_symlink(os.path.join(tempdir, 'c')),
+                call.create_symlink(os.path.abspath('c3'), os.path.join(tempdir, 'c')),
             ],
         ),
     ]
 
     for paths in fdl._each_set_of_linked_candidates(candidates):
-        exp_paths, create_symlink_calls = exp.pop(0)
+        exp_paths, exp_mock_calls = exp.pop(0)
         for candidate in exp_paths.values():
             candidate['temporary_location'] = tempdir
         assert paths == exp_paths
-        assert fdl._create_symlink.call_args_list == create_symlink_calls
-        fdl._create_symlink.reset_mock()
+        assert mocks.mock_calls == exp_mock_calls
+        mocks.reset_mock()
 
     # Assert _each_set_of_linked_candidates() went through all expected states
     assert len(exp) == 0
 
+    # Assert one temporary directory is used for all states
+    assert TemporaryDirectory_mock.__enter__.call_count == 1
+    assert TemporaryDirectory_mock.__exit__.call_count == 1
+
+
+def test_FindDownloadLocation_remove_symlink(mocker):
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    unlink_mock = mocker.patch('os.unlink')
+    fdl._remove_symlink('path/to/target')
+    assert unlink_mock.call_args_list == [call('path/to/target')]
+
+
+def test_FindDownloadLocation_remove_symlink_fails(mocker):
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    mocker.patch('os.unlink', side_effect=OSError(errno.EACCES, 'Permission denied'))
+    with pytest.raises(FindError, match=r'^Failed to remove path/to/target: Permission denied$'):
+        fdl._remove_symlink('path/to/target')
+
+
+def test_FindDownloadLocation_init_deduplicates_locations_with_symlinks(tmp_path):
+    (tmp_path / 'a' / 'b').mkdir(parents=True)
+    (tmp_path / 'link').symlink_to(tmp_path / 'a' / 'b')
+
+    # "link/.." is "a", not `tmp_path`
+    locations = (
+        str(tmp_path),
+        str(tmp_path / 'a'),
+        os.path.join(str(tmp_path / 'link'), '..'),
+        str(tmp_path / 'link'),
+        str(tmp_path / 'a' / 'b'),
+    )
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=locations)
+    assert fdl._locations == (
+        str(tmp_path),
+        str(tmp_path / 'a'),
+        str(tmp_path / 'link'),
+    )
+
 
 @pytest.mark.parametrize(
     argnames='piece_indexes, verify_piece_return_values, exp_verify_piece_calls, exp_return_value',
@@ -326,23 +420,72 @@ def test_FindDownloadLocation_each_set_of_linked_candidates(mocker, tmp_path):
 def test_FindDownloadLocation_verify_file(piece_indexes, verify_piece_return_values, exp_verify_piece_calls,
                                           exp_return_value, mocker, tmp_path):
     fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
-    mock_torrent = mocker.patch.object(fdl, '_torrent')
-    mock_torrent.configure_mock(name='My Torrent')
-    TorrentFileStream_mock = mocker.patch('torf.TorrentFileStream')
-    tfs_mock = TorrentFileStream_mock.return_value.__enter__.return_value
+    tfs_mock = MagicMock()
     tfs_mock.get_absolute_piece_indexes.return_value = piece_indexes
     tfs_mock.verify_piece.side_effect = verify_piece_return_values
     mock_location = 'path/to/location'
 
-    return_value = fdl._verify_file('mock/file/path', mock_location)
+    return_value = fdl._verify_file('mock/file/path', tfs_mock, mock_location)
     assert return_value is exp_return_value
 
-    exp_content_path = os.path.join(mock_location, fdl._torrent.name)
-    assert TorrentFileStream_mock.call_args_list == [call(fdl._torrent, content_path=exp_content_path)]
     assert tfs_mock.get_absolute_piece_indexes.call_args_list == [call('mock/file/path', (1, -2))]
     assert tfs_mock.verify_piece.call_args_list == exp_verify_piece_calls
 
 
+def test_FindDownloadLocation_verify_file_caches_piece_results(mocker, tmp_path):
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    tfs_mock = MagicMock()
+    tfs_mock.get_absolute_piece_indexes.return_value = [1, 2]
+    tfs_mock.get_files_at_piece_index.side_effect = lambda pi: {
+        1: ['My Torrent/a'],
+        2: ['My Torrent/a', 'My Torrent/b'],
+    }[pi]
+    tfs_mock.verify_piece.return_value = True
+
+    (tmp_path / 'data').mkdir()
+    for name in ('a', 'b1', 'b2'):
+        (tmp_path / 'data' / name).write_bytes(b'mock data')
+
+    def link(location, **files):
+        for torrent_file, existing_file in files.items():
+            linkpath = tmp_path / location / 'My Torrent' / torrent_file
+            linkpath.parent.mkdir(parents=True, exist_ok=True)
+            linkpath.symlink_to(tmp_path / 'data' / existing_file)
+        return str(tmp_path / location)
+
+    # Same files in different location
+    assert fdl._verify_file('My Torrent/a', tfs_mock, link('tmp1', a='a', b='b1')) is True
+    assert fdl._verify_file('My Torrent/a', tfs_mock, link('tmp2', a='a', b='b1')) is True
+    assert tfs_mock.verify_piece.call_args_list == [call(1), call(2)]
+
+    # Piece 2 has a different neighbouring file
+    assert fdl._verify_file('My Torrent/a', tfs_mock, link('tmp3', a='a', b='b2')) is True
+    assert tfs_mock.verify_piece.call_args_list == [call(1), call(2), call(2)]
+
+
+def test_FindDownloadLocation_verify_file_checks_cached_pieces_first(mocker, tmp_path):
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    tfs_mock = MagicMock()
+    tfs_mock.get_absolute_piece_indexes.side_effect = lambda file, _: {
+        'My Torrent/a': [1, 2],
+        'My Torrent/b': [2, 3],
+    }[file]
+    tfs_mock.get_files_at_piece_index.side_effect = lambda pi: {
+        1: ['My Torrent/a'],
+        2: ['My Torrent/a', 'My Torrent/b'],
+        3: ['My Torrent/b'],
+    }[pi]
+    tfs_mock.verify_piece.side_effect = lambda pi: pi != 2
+    location = str(tmp_path)
+
+    assert fdl._verify_file('My Torrent/b', tfs_mock, location) is False
+    assert tfs_mock.verify_piece.call_args_list == [call(2)]
+
+    # Piece 2 is already known to be invalid, piece 1 is not hashed.
+    assert fdl._verify_file('My Torrent/a', tfs_mock, location) is False
+    assert tfs_mock.verify_piece.call_args_list == [call(2)]
+
+
 def test_FindDownloadLocation_get_size_matching_candidates(mocker, tmp_path):
     files = (
         tmp_path / '.1',
@@ -424,6 +567,135 @@ def test_FindDownloadLocation_get_size_matching_candidates(mocker, tmp_path):
     assert candidates == exp_candidates
 
 
+def test_FindDownloadLocation_get_path_matcher():
+    matcher = FindDownloadLocation._get_path_matcher('a/b/ab.2')
+    for path, exp_similarity in (('b/ab2', 0.7692307692307693), ('a2', 0.4), ('c2', 0.2), ('a/b/ab.2', 1.0)):
+        matcher.set_seq1(path)
+        assert matcher.ratio() == exp_similarity
+
+
+@pytest.mark.parametrize(
+    argnames='a, b',
+    argvalues=(
+        ('', ''),
+        ('foo', 'foo'),
+        ('foo/bar', 'bar'),
+        ('bar', 'foo/bar'),
+        ('abc', 'xyz'),
+        ('Foo/Foo.S01E01.mkv', 'foo.s01e01.mkv'),
+    ),
+)
+def test_FindDownloadLocation_get_path_similarity_limit(a, b):
+    limit = FindDownloadLocation._get_path_similarity_limit(a, b)
+    assert limit == difflib.SequenceMatcher(None, a, b).real_quick_ratio()
+    matcher = FindDownloadLocation._get_path_matcher(b)
+    matcher.set_seq1(a)
+    assert limit >= matcher.ratio()
+
+
+def test_FindDownloadLocation_get_size_matching_candidates_keeps_files_in_discovery_order(mocker):
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('path/to/a', 'path/to/b'))
+    mocker.patch.object(fdl, '_torrent', Mock(files=(
+        MockFile('t/1', size=1),
+        MockFile('t/2', size=2),
+        MockFile('t/3', size=3),
+    )))
+    mocker.patch.object(fdl, '_each_file', return_value=(
+        ('path/to/a/t/3', 'path/to/a', 3),
+        ('path/to/b/t/1', 'path/to/b', 1),
+        ('path/to/b/t/2', 'path/to/b', 2),
+        ('path/to/b/t/3', 'path/to/b', 3),
+    ))
+    candidates = fdl._get_size_matching_candidates()
+    # The first verified file determines the download location, so the file
+    # found in the first location must come first.
+    assert list(candidates) == ['t/3', 't/1', 't/2']
+    assert [c['location'] for c in candidates['t/3']] == ['path/to/a', 'path/to/b']
+
+
+def test_FindDownloadLocation_find_prefers_first_location_with_matching_file(tmp_path):
+    torrent_content = tmp_path / 'content' / 'My Torrent'
+    torrent_content.mkdir(parents=True)
+    for name, size in (('1', 100), ('2', 200), ('3', 300)):
+        (torrent_content / name).write_bytes(bytes(random.getrandbits(8) for _ in range(size)))
+    torrent = torf.Torrent(path=torrent_content, piece_size=16384)
+    torrent.generate()
+    torrent_filepath = tmp_path / 'my.torrent'
+    torrent.write(torrent_filepath)
+
+    # First location only has the last file in the torrent
+    location_a = tmp_path / 'a'
+    (location_a / 'My Torrent').mkdir(parents=True)
+    os.link(torrent_content / '3', location_a / 'My Torrent' / '3')
+    # Second location has all files
+    location_b = tmp_path / 'b'
+    (location_b / 'My Torrent').mkdir(parents=True)
+    for name in ('1', '2', '3'):
+        os.link(torrent_content / name, location_b / 'My Torrent' / name)
+
+    fdl = FindDownloadLocation(torrent=torrent_filepath, locations=(location_a, location_b))
+    assert fdl.find() == str(location_a)
+    for name in ('1', '2', '3'):
+        assert (location_a / 'My Torrent' / name).read_bytes() == (torrent_content / name).read_bytes()
+
+
+def test_FindDownloadLocation_get_size_matching_candidates_skips_hopeless_candidates(mocker):
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('path/to/a',))
+    mocker.patch.object(fdl, '_torrent', Mock(files=(MockFile('foo1', size=1),)))
+    mocker.patch.object(fdl, '_each_file', return_value=(
+        (f'path/to/a/{name}', 'path/to/a', 1)
+        for name in ('foo2', 'much_longer_name', 'foo1', 'foo3', 'f', 'fo', 'foo4')
+    ))
+    matcher = Mock(wraps=difflib.SequenceMatcher(b='foo1'))
+    mocker.patch.object(fdl, '_get_path_matcher', return_value=matcher)
+
+    candidates = fdl._get_size_matching_candidates()
+    assert [c['filepath_rel'] for c in candidates['foo1']] == ['foo1', 'foo2', 'foo3']
+    assert matcher.set_seq1.call_args_list == [
+        call('foo2'),
+        call('much_longer_name'),
+        call('foo3'),
+        call('foo4'),
+    ]
+    # "foo4" is excluded by SequenceMatcher.quick_ratio()
+    assert matcher.ratio.call_count == 3
+
+
+@pytest.mark.parametrize('level, exp_debug_enabled', ((logging.DEBUG, True), (logging.INFO, False)))
+def test_FindDownloadLocation_candidate_debug_messages(level, exp_debug_enabled, mocker, caplog, tmp_path):
+    caplog.set_level(level, logger=__project_name__)
+    assert tofipa._debug_enabled() is exp_debug_enabled
+
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('path/to/a',))
+    mocker.patch.object(fdl, '_torrent', Mock(files=(MockFile('t/1', size=1),)))
+    mocker.patch.object(fdl, '_each_file', return_value=(
+        ('path/to/a/t/1', 'path/to/a', 1),
+        ('path/to/a/x/1', 'path/to/a', 1),
+    ))
+    mocker.patch.object(fdl, '_create_symlink')
+    mocker.patch.object(fdl, '_remove_symlink')
+    mocker.patch.object(type(fdl), '_temporary_directory', PropertyMock(return_value=Mock(
+        __enter__=Mock(return_value=str(tmp_path / 'templinks')),
+        __exit__=Mock(return_value=False),
+    )))
+
+    candidates = fdl._get_size_matching_candidates()
+    assert len(list(fdl._each_set_of_linked_candidates(candidates))) == 2
+
+    messages = [record.getMessage() for record in caplog.records]
+    exp_messages = [
+        "Size matches for 't/1'",
+        ' * path/to/a/t/1 [1.00]',
+        ' * path/to/a/x/1 [0.67]',
+        'Iterating over combinations of temporary symlinks:',
+        "  * ['path/to/a/t/1', 'path/to/a/x/1'] -> t/1",
+    ]
+    for exp_message in exp_messages:
+        assert (exp_message in messages) is exp_debug_enabled
+    if not exp_debug_enabled:
+        assert messages == []
+
+
 def test_FindDownloadLocation_each_file(tmp_path):
     files = (
         tmp_path / '1',
@@ -441,72 +713,252 @@ def test_FindDownloadLocation_each_file(tmp_path):
 
     fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
     assert sorted(fdl._each_file(tmp_path / 'a')) == [
-        (str(tmp_path / 'a' / '2'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / '3'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / 'b' / '4'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / 'b' / '5'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / 'b' / '6'), str(tmp_path / 'a')),
+        (str(tmp_path / 'a' / '2'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / '3'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / 'b' / '4'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / 'b' / '5'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / 'b' / '6'), str(tmp_path / 'a'), 9),
     ]
     assert sorted(fdl._each_file(tmp_path / 'a', tmp_path / 'c' / '8')) == [
-        (str(tmp_path / 'a' / '2'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / '3'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / 'b' / '4'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / 'b' / '5'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / 'b' / '6'), str(tmp_path / 'a')),
-        (str(tmp_path / 'c' / '8'), str(tmp_path / 'c' / '8')),
+        (str(tmp_path / 'a' / '2'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / '3'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / 'b' / '4'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / 'b' / '5'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / 'b' / '6'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'c' / '8'), str(tmp_path / 'c' / '8'), 9),
     ]
     assert sorted(fdl._each_file(tmp_path / 'a', tmp_path / 'c')) == [
-        (str(tmp_path / 'a' / '2'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / '3'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / 'b' / '4'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / 'b' / '5'), str(tmp_path / 'a')),
-        (str(tmp_path / 'a' / 'b' / '6'), str(tmp_path / 'a')),
-        (str(tmp_path / 'c' / '7'), str(tmp_path / 'c')),
-        (str(tmp_path / 'c' / '8'), str(tmp_path / 'c')),
+        (str(tmp_path / 'a' / '2'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / '3'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / 'b' / '4'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / 'b' / '5'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / 'b' / '6'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'c' / '7'), str(tmp_path / 'c'), 9),
+        (str(tmp_path / 'c' / '8'), str(tmp_path / 'c'), 9),
     ]
     assert sorted(fdl._each_file(tmp_path / 'a' / 'b', tmp_path / 'c')) == [
-        (str(tmp_path / 'a' / 'b' / '4'), str(tmp_path / 'a' / 'b')),
-        (str(tmp_path / 'a' / 'b' / '5'), str(tmp_path / 'a' / 'b')),
-        (str(tmp_path / 'a' / 'b' / '6'), str(tmp_path / 'a' / 'b')),
-        (str(tmp_path / 'c' / '7'), str(tmp_path / 'c')),
-        (str(tmp_path / 'c' / '8'), str(tmp_path / 'c')),
+        (str(tmp_path / 'a' / 'b' / '4'), str(tmp_path / 'a' / 'b'), 9),
+        (str(tmp_path / 'a' / 'b' / '5'), str(tmp_path / 'a' / 'b'), 9),
+        (str(tmp_path / 'a' / 'b' / '6'), str(tmp_path / 'a' / 'b'), 9),
+        (str(tmp_path / 'c' / '7'), str(tmp_path / 'c'), 9),
+        (str(tmp_path / 'c' / '8'), str(tmp_path / 'c'), 9),
+    ]
+
+
+def test_FindDownloadLocation_each_file_ignores_special_files(tmp_path):
+    (tmp_path / 'target').mkdir()
+    (tmp_path / 'target' / 'file').write_bytes(b'mock data')
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'a' / 'directory_link').symlink_to(tmp_path / 'target')
+    (tmp_path / 'a' / 'file_link').symlink_to(tmp_path / 'target' / 'file')
+    (tmp_path / 'a' / 'broken_link').symlink_to(tmp_path / 'nonexisting')
+    os.mkfifo(tmp_path / 'a' / 'fifo')
+
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    assert sorted(fdl._each_file(tmp_path / 'a')) == [
+        (str(tmp_path / 'a' / 'directory_link' / 'file'), str(tmp_path / 'a'), 9),
+        (str(tmp_path / 'a' / 'file_link'), str(tmp_path / 'a'), 9),
+    ]
+
+
+def test_FindDownloadLocation_each_file_yields_only_files_with_given_sizes(tmp_path):
+    for f, size in (
+        (tmp_path / 'a' / '1', 1),
+        (tmp_path / 'a' / 'b' / '2', 2),
+        (tmp_path / 'a' / 'b' / '3', 3),
+        (tmp_path / 'c' / '4', 2),
+        (tmp_path / 'd', 3),
+        (tmp_path / 'e', 2),
+    ):
+        f.parent.mkdir(parents=True, exist_ok=True)
+        f.write_bytes(b'x' * size)
+
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    assert sorted(fdl._each_file(tmp_path / 'a', sizes={2, 4})) == [
+        (str(tmp_path / 'a' / 'b' / '2'), str(tmp_path / 'a'), 2),
+    ]
+    assert sorted(fdl._each_file(tmp_path / 'a', tmp_path / 'c', tmp_path / 'd', tmp_path / 'e', sizes={2})) == [
+        (str(tmp_path / 'a' / 'b' / '2'), str(tmp_path / 'a'), 2),
+        (str(tmp_path / 'c' / '4'), str(tmp_path / 'c'), 2),
+        (str(tmp_path / 'e'), str(tmp_path / 'e'), 2),
+    ]
+    assert list(fdl._each_file(tmp_path / 'nonexisting', sizes={2})) == []
+
+
+def test_FindDownloadLocation_each_file_walks_single_path_without_thread_pool(mocker, tmp_path):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'a' / '1').write_bytes(b'mock data')
+    ThreadPoolExecutor_mock = mocker.patch('concurrent.futures.ThreadPoolExecutor')
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    assert list(fdl._each_file(tmp_path / 'a')) == [
+        (str(tmp_path / 'a' / '1'), str(tmp_path / 'a'), 9),
+    ]
+    assert ThreadPoolExecutor_mock.call_args_list == []
+
+
+@pytest.mark.parametrize(
+    argnames='paths_count, max_walkers, exp_max_workers',
+    argvalues=(
+        (2, 8, 2),
+        (8, 8, 8),
+        (9, 8, 8),
+        (5, 3, 3),
+    ),
+)
+def test_FindDownloadLocation_each_file_limits_walker_threads(paths_count, max_walkers, exp_max_workers, mocker):
+    ThreadPoolExecutor_mock = mocker.patch(
+        'concurrent.futures.ThreadPoolExecutor',
+        wraps=concurrent.futures.ThreadPoolExecutor,
+    )
+    mocker.patch('os.cpu_count', return_value=1)
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    mocker.patch.object(fdl, '_max_walkers', max_walkers)
+    mocker.patch.object(fdl, '_walk', return_value=[])
+    paths = [f'path/to/{i}' for i in range(paths_count)]
+    assert list(fdl._each_file(*paths)) == []
+    assert ThreadPoolExecutor_mock.call_args_list == [call(max_workers=exp_max_workers)]
+
+
+@pytest.mark.parametrize('paths', (('path/to/a',), ('path/to/a', 'path/to/b')), ids=('one path', 'two paths'))
+def test_FindDownloadLocation_each_file_logs_path_before_walking_it(paths, mocker, caplog):
+    caplog.set_level(logging.DEBUG, logger=__project_name__)
+
+    def walk_mock(path, sizes):
+        assert f'Searching {path}' in [record.getMessage() for record in caplog.records]
+        return [(f'{path}/file', 1)]
+
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    mocker.patch.object(fdl, '_walk', side_effect=walk_mock)
+    assert list(fdl._each_file(*paths, sizes={1})) == [
+        (f'{path}/file', path, 1)
+        for path in paths
+    ]
+    assert fdl._walk.call_args_list == [call(path, {1}) for path in paths]
+
+
+def test_FindDownloadLocation_walk_finds_files_in_same_order_as_os_walk(tmp_path):
+    for f in (
+        tmp_path / 'z' / '1',
+        tmp_path / 'z' / 'y' / '2',
+        tmp_path / 'z' / 'y' / 'x' / '3',
+        tmp_path / 'z' / 'y' / 'x' / '4',
+        tmp_path / 'z' / 'w' / '5',
+        tmp_path / 'a' / '6',
+        tmp_path / 'a' / 'b' / 'c' / '7',
+        tmp_path / 'a' / 'b' / '8',
+        tmp_path / 'a' / 'd' / '9',
+        tmp_path / '10',
+        tmp_path / '11',
+    ):
+        f.parent.mkdir(parents=True, exist_ok=True)
+        f.write_bytes(b'mock data')
+
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    exp_filepaths = [
+        os.path.join(root, filename)
+        for root, dirnames, filenames in os.walk(str(tmp_path), followlinks=True)
+        for filename in filenames
     ]
+    assert [filepath for filepath, size in fdl._walk(str(tmp_path))] == exp_filepaths
+
+
+def test_FindDownloadLocation_walk_handles_errors(mocker):
+    def make_entry(name, is_dir=False, is_file=False):
+        entry = Mock(
+            is_dir=Mock(return_value=is_dir) if not isinstance(is_dir, BaseException) else Mock(side_effect=is_dir),
+            is_file=Mock(return_value=is_file),
+            stat=Mock(return_value=Mock(st_size=len(name))),
+        )
+        entry.configure_mock(name=name)
+        return entry
+
+    def partial_listing():
+        yield make_entry('c', is_file=True)
+        raise OSError(errno.EIO, 'Input/output error')
+
+    listings = {
+        'root': lambda: iter([
+            make_entry('a', is_file=True),
+            make_entry('weird', is_dir=OSError(errno.EACCES, 'Permission denied')),
+            make_entry('unreadable', is_dir=True),
+            make_entry('partial', is_dir=True),
+            make_entry('bb', is_file=True),
+        ]),
+        os.path.join('root', 'partial'): partial_listing,
+    }
 
+    def scandir_mock(dirpath):
+        if dirpath not in listings:
+            raise OSError(errno.EACCES, 'Permission denied')
+        return MagicMock(__enter__=Mock(return_value=listings[dirpath]()))
 
-def test_FindDownloadLocation_is_size_match(mocker):
     fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
-    get_file_size_mock = mocker.patch.object(fdl, '_get_file_size', return_value=456)
-    assert fdl._is_size_match(Mock(size=123), 'path/to/foo') is False
-    assert get_file_size_mock.call_args_list == [call('path/to/foo')]
-    assert fdl._is_size_match(Mock(size=456), 'path/to/bar') is True
-    assert get_file_size_mock.call_args_list == [call('path/to/foo'), call('path/to/bar')]
-    assert fdl._is_size_match(Mock(size=789), 'path/to/baz') is False
-    assert get_file_size_mock.call_args_list == [call('path/to/foo'), call('path/to/bar'), call('path/to/baz')]
+    mocker.patch.object(fdl, '_get_stat', return_value=Mock(st_mode=stat.S_IFDIR | 0o755))
+    mocker.patch.object(fdl, '_scandir', side_effect=scandir_mock)
+    assert fdl._walk('root') == [
+        (os.path.join('root', 'a'), 1),
+        (os.path.join('root', 'bb'), 2),
+        (os.path.join('root', 'partial', 'c'), 1),
+    ]
+    assert fdl._scandir.call_args_list == [
+        call('root'),
+        call(os.path.join('root', 'unreadable')),
+        call(os.path.join('root', 'partial')),
+    ]
+
+
+@pytest.mark.parametrize('supports_fd', (True, False), ids=('with fd', 'without fd'))
+def test_FindDownloadLocation_scandir(supports_fd, mocker, tmp_path):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').write_bytes(b'mock data')
+    if not supports_fd:
+        mocker.patch('os.supports_fd', set())
+    with FindDownloadLocation._scandir(str(tmp_path)) as entries:
+        assert sorted((entry.name, entry.is_dir(), entry.stat().st_size if not entry.is_dir() else None)
+                      for entry in entries) == [('a', True, None), ('b', False, 9)]
+
+
+def test_FindDownloadLocation_scandir_opens_directory_only(mocker, tmp_path):
+    (tmp_path / 'file').write_bytes(b'mock data')
+    mocker.patch('os.supports_fd', {os.scandir})
+    open_mock = mocker.patch('os.open', wraps=os.open)
+    with pytest.raises(NotADirectoryError):
+        with FindDownloadLocation._scandir(str(tmp_path / 'file')):
+            pass
+    assert open_mock.call_args_list == [call(str(tmp_path / 'file'), os.O_RDONLY | os.O_DIRECTORY)]
 
 
 @pytest.mark.parametrize(
-    argnames='is_dir, getsize_result, exp_return_value',
+    argnames='stat_result, exp_return_value',
     argvalues=(
-        (True, None, None),
-        (True, OSError('nope'), None),
-        (False, OSError('nope'), None),
-        (False, 123456, 123456),
+        (Mock(st_mode=stat.S_IFDIR | 0o755, st_size=4096), None),
+        (OSError('nope'), None),
+        (Mock(st_mode=stat.S_IFREG | 0o644, st_size=123456), 123456),
     ),
 )
-def test_FindDownloadLocation_get_file_size(is_dir, getsize_result, exp_return_value, mocker):
+def test_FindDownloadLocation_get_file_size(stat_result, exp_return_value, mocker):
     fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
-    isdir_mock = mocker.patch('os.path.isdir', return_value=is_dir)
-    if isinstance(getsize_result, BaseException):
-        getsize_mock = mocker.patch('os.path.getsize', side_effect=getsize_result)
+    if isinstance(stat_result, BaseException):
+        stat_mock = mocker.patch('os.stat', side_effect=stat_result)
     else:
-        getsize_mock = mocker.patch('os.path.getsize', return_value=getsize_result)
+        stat_mock = mocker.patch('os.stat', return_value=stat_result)
     return_value = fdl._get_file_size('path/to/foo')
     assert return_value == exp_return_value
-    assert isdir_mock.call_args_list == [call('path/to/foo')]
-    if is_dir:
-        assert getsize_mock.call_args_list == []
-    else:
-        assert getsize_mock.call_args_list == [call('path/to/foo')]
+    assert stat_mock.call_args_list == [call('path/to/foo')]
+
+    # Second call is cached
+    return_value = fdl._get_file_size('path/to/foo')
+    assert return_value == exp_return_value
+    assert stat_mock.call_args_list == [call('path/to/foo')]
+
+
+def test_FindDownloadLocation_walk_stats_file_path_once(mocker, tmp_path):
+    filepath = tmp_path / 'foo'
+    filepath.write_bytes(b'x' * 123)
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    stat_mock = mocker.patch('os.stat', wraps=os.stat)
+    assert fdl._walk(str(filepath)) == [(str(filepath), 123)]
+    assert stat_mock.call_args_list == [call(str(filepath))]
 
 
 def test_FindDownloadLocation_create_hardlink(mocker):
@@ -545,6 +997,26 @@ def test_FindDownloadLocation_hardlink_or_symlink(hardlink_exception, symlink_ex
         assert symlink_mock.call_args_list == []
 
 
+def test_FindDownloadLocation_hardlink_or_symlink_remembers_cross_device_directories(mocker):
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    hardlink_mock = mocker.patch('os.link', Mock(side_effect=OSError(errno.EXDEV, 'Cross-device')))
+    symlink_mock = mocker.patch('os.symlink')
+
+    fdl._hardlink_or_symlink('path/to/source1', 'path/to/target1')
+    fdl._hardlink_or_symlink('path/to/source2', 'path/to/target2')
+    fdl._hardlink_or_symlink('path/to/source3', 'other/path/to/target3')
+
+    assert hardlink_mock.call_args_list == [
+        call('path/to/source1', 'path/to/target1'),
+        call('path/to/source3', 'other/path/to/target3'),
+    ]
+    assert symlink_mock.call_args_list == [
+        call('path/to/source1', 'path/to/target1'),
+        call('path/to/source2', 'path/to/target2'),
+        call('path/to/source3', 'other/path/to/target3'),
+    ]
+
+
 def test_FindDownloadLocation_create_symlink(mocker):
     fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
     mocker.patch.object(fdl, '_create_link', Mock(return_value='foo'))
@@ -556,30 +1028,91 @@ def test_FindDownloadLocation_create_link_that_already_exists(mocker):
     mocks = Mock()
     mocks.attach_mock(mocker.patch('os.path.exists', return_value=True), 'exists')
     mocks.attach_mock(mocker.patch('os.makedirs'), 'makedirs')
-    mocks.attach_mock(Mock(__qualname__='mylink'), 'create_link_function')
+    mocks.attach_mock(Mock(__qualname__='mylink', side_effect=FileExistsError(errno.EEXIST, 'File exists')),
+                      'create_link_function')
 
     fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
     fdl._create_link(mocks.create_link_function, 'path/to/source', 'path/to/target')
 
     assert mocks.mock_calls == [
+        call.create_link_function('path/to/source', 'path/to/target'),
+        call.exists('path/to/target'),
+    ]
+
+
+def test_FindDownloadLocation_create_link_that_already_exists_as_broken_symlink(mocker):
+    mocks = Mock()
+    mocks.attach_mock(mocker.patch('os.path.exists', return_value=False), 'exists')
+    mocks.attach_mock(mocker.patch('os.makedirs'), 'makedirs')
+    mocks.attach_mock(Mock(__qualname__='mylink', side_effect=FileExistsError(errno.EEXIST, 'File exists')),
+                      'create_link_function')
+
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    with pytest.raises(FindError, match=r'^Failed to link path/to/source to path/to/target: File exists$'):
+        fdl._create_link(mocks.create_link_function, 'path/to/source', 'path/to/target')
+
+    assert mocks.mock_calls == [
+        call.create_link_function('path/to/source', 'path/to/target'),
         call.exists('path/to/target'),
     ]
 
+
 def test_FindDownloadLocation_create_link_fails_to_create_parent_directories(mocker):
     mocks = Mock()
     mocks.attach_mock(mocker.patch('os.path.exists', return_value=False), 'exists')
+    mocks.attach_mock(mocker.patch('os.path.isdir', return_value=False), 'isdir')
     mocks.attach_mock(mocker.patch('os.makedirs', side_effect=OSError('nope')), 'makedirs')
-    mocks.attach_mock(Mock(__qualname__='mylink'), 'create_link_function')
+    mocks.attach_mock(Mock(__qualname__='mylink', side_effect=FileNotFoundError(errno.ENOENT, 'No such file')),
+                      'create_link_function')
 
     fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
     with pytest.raises(FindError, match=r'^Failed to create directory path/to: nope$'):
         fdl._create_link(mocks.create_link_function, 'path/to/source', 'path/to/target')
 
     assert mocks.mock_calls == [
-        call.exists('path/to/target'),
+        call.create_link_function('path/to/source', 'path/to/target'),
+        call.isdir('path/to'),
+        call.makedirs('path/to', exist_ok=True),
+    ]
+
+
+def test_FindDownloadLocation_create_link_with_nonexisting_source(mocker):
+    mocks = Mock()
+    mocks.attach_mock(mocker.patch('os.path.exists', return_value=False), 'exists')
+    mocks.attach_mock(mocker.patch('os.path.isdir', return_value=True), 'isdir')
+    mocks.attach_mock(mocker.patch('os.makedirs'), 'makedirs')
+    mocks.attach_mock(Mock(__qualname__='mylink', side_effect=FileNotFoundError(errno.ENOENT, 'No such file')),
+                      'create_link_function')
+
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    with pytest.raises(FindError, match=r'^Failed to link path/to/source to path/to/target: No such file$'):
+        fdl._create_link(mocks.create_link_function, 'path/to/source', 'path/to/target')
+
+    assert mocks.mock_calls == [
+        call.create_link_function('path/to/source', 'path/to/target'),
+        call.isdir('path/to'),
+    ]
+
+
+def test_FindDownloadLocation_create_link_creates_parent_directories(mocker):
+    mocks = Mock()
+    mocks.attach_mock(mocker.patch('os.path.exists', return_value=False), 'exists')
+    mocks.attach_mock(mocker.patch('os.path.isdir', return_value=False), 'isdir')
+    mocks.attach_mock(mocker.patch('os.makedirs'), 'makedirs')
+    mocks.attach_mock(Mock(__qualname__='mylink', side_effect=(FileNotFoundError(errno.ENOENT, 'No such file'), None)),
+                      'create_link_function')
+
+    fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
+    fdl._create_link(mocks.create_link_function, 'path/to/source', 'path/to/target')
+
+    assert mocks.mock_calls == [
+        call.create_link_function('path/to/source', 'path/to/target'),
+        call.isdir('path/to'),
         call.makedirs('path/to', exist_ok=True),
+        call.create_link_function('path/to/source', 'path/to/target'),
     ]
 
+
 def test_FindDownloadLocation_create_link_fails_to_create_link(mocker):
     mocks = Mock()
     mocks.attach_mock(mocker.patch('os.path.exists', return_value=False), 'exists')
@@ -591,8 +1124,6 @@ def test_FindDownloadLocation_create_link_fails_to_create_link(mocker):
         fdl._create_link(mocks.create_link_function, 'path/to/source', 'path/to/target')
 
     assert mocks.mock_calls == [
-        call.exists('path/to/target'),
-        call.makedirs('path/to', exist_ok=True),
         call.create_link_function('path/to/source', 'path/to/target'),
     ]
 
@@ -606,8 +1137,6 @@ def test_FindDownloadLocation_create_link_creates_link(mocker):
     fdl._create_link(mocks.create_link_function, 'path/to/source', 'path/to/target')
 
     assert mocks.mock_calls == [
-        call.exists('path/to/target'),
-        call.makedirs('path/to', exist_ok=True),
         call.create_link_function('path/to/source', 'path/to/target'),
     ]
 
@@ -616,8 +1145,31 @@ def test_FindDownloadLocation_temporary_directory(mocker):
     fdl = FindDownloadLocation(torrent='mock.torrent', locations=('a', 'b', 'c'))
     fdl._torrent = Mock()
     fdl._torrent.name = f"This {os.sep} & That's It 1234"
+    mocker.patch.object(fdl, '_get_temporary_directory_parent', return_value='path/to/tmp')
     TemporaryDirectory_mock = mocker.patch('tempfile.TemporaryDirectory')
     assert fdl._temporary_directory is TemporaryDirectory_mock.return_value
     assert TemporaryDirectory_mock.call_args_list == [
-        call(prefix=f"{__project_name__}.This _ _ That's It 1234."),
+        call(prefix=f"{__project_name__}.This _ _ That's It 1234.", dir='path/to/tmp'),
     ]
+
+
+@pytest.mark.parametrize(
+    argnames='environ, ramfs_exists, ramfs_writable, exp_return_value',
+    argvalues=(
+        ({}, True, True, '/dev/shm'),
+        ({}, False, True, None),
+        ({}, True, False, None),
+        ({'TMPDIR': 'my/tmp'}, True, True, None),
+        ({'TEMP': 'my/tmp'}, True, True, None),
+        ({'TMP': 'my/tmp'}, True, True, None),
+        ({'TMPDIR': ''}, True, True, '/dev/shm'),
+    ),
+)
+def test_FindDownloadLocation_get_temporary_directory_parent(environ, ramfs_exists, ramfs_writable,
+                                                             exp_return_value, mocker):
+    for name in ('TMPDIR', 'TEMP', 'TMP'):
+        mocker.patch.dict('os.environ', {name: ''})
+    mocker.patch.dict('os.environ', environ)
+    mocker.patch('os.path.isdir', return_value=ramfs_exists)
+    mocker.patch('os.access', return_value=ramfs_writable)
+    assert FindDownloadLocation._get_temporary_directory_parent() == exp_return_value
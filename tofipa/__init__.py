@@ -7,8 +7,32 @@ __author_email__ = 'plotski@example.org'
 
 import logging  # isort:skip
 from . import __project_name__  # isort:skip
-_debug = logging.getLogger(__project_name__).debug
+_logger = logging.getLogger(__project_name__)
+_debug = _logger.debug
 
-from ._cli import cli
-from ._errors import FindError
-from ._location import FindDownloadLocation
+
+def _debug_enabled():
+    # Whether it is worth preparing arguments for _debug()
+    return _logger.isEnabledFor(logging.DEBUG)
+
+
+# Public names are imported on first access so that importing the package (e.g.
+# for __version__) doesn't pull in torf and friends.
+_lazy_attributes = {
+    'cli': '._cli',
+    'FindError': '._errors',
+    'FindDownloadLocation': '._location',
+}
+
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        import importlib
+        module = importlib.import_module(_lazy_attributes[name], __name__)
+        value = globals()[name] = getattr(module, name)
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
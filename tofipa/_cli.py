@@ -1,11 +1,10 @@
-import argparse
 import sys
 
-from . import (__description__, __project_name__, __version__, _config,
-               _errors, _location)
+from . import __description__, __project_name__, __version__, _config, _errors
 
 
 def _parse_args(args):
+    import argparse
     argparser = argparse.ArgumentParser(
         prog=__project_name__,
         description=__description__,
@@ -55,6 +54,13 @@ def _fatal_error(msg):
 def cli(args=None):
     if args is None:
         args = sys.argv[1:]
+
+    # Don't bother with argparse if we only have to print the version. Exit
+    # like argparse's "version" action does.
+    if list(args) == ['--version']:
+        sys.stdout.write(f'{__project_name__} {__version__}\n')
+        sys.exit(0)
+
     args = _parse_args(args)
 
     # Debugging
@@ -74,6 +80,8 @@ def cli(args=None):
             _fatal_error(f'No locations specified. See: {__project_name__} --help')
 
     # Find location for torrent
+    # Importing torf is expensive and not needed for --help, --version, etc.
+    from . import _location
     location_finder = _location.FindDownloadLocation(
         torrent=args.TORRENT,
         locations=locations,
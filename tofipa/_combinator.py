@@ -27,58 +27,52 @@ class Combinator(collections.abc.Iterable):
     """
 
     def __init__(self, things):
-        self._things = {
-            key: tuple(items)
-            for key, items in things.items()
-        }
-        self._keys = tuple(self._things)
-        self._indexes = {
-            key: 0 if len(self._things[key]) > 0 else -1
-            for key in self._keys
-        }
-        self._locked_keys = set()
+        # Keys and their lists are stored as parallel tuples. The current
+        # combination is a list of indexes into each list.
+        self._keys = tuple(things)
+        self._axes = tuple(tuple(things[key]) for key in self._keys)
+        self._key_index = {key: i for i, key in enumerate(self._keys)}
+        self._indexes = [0] * len(self._keys)
+        # Bit i is set if self._keys[i] is locked.
+        self._locked_mask = 0
+        self._all_locked_mask = (1 << len(self._keys)) - 1
 
     @property
     def _current_pairs(self):
         # List of (key, list item) tuples for each key using current list
         # indexes.
-        pairs = []
-        for key in self._keys:
-            item = self._things[key][self._indexes[key]]
-            pairs.append((key, item))
-        return pairs
+        return list(zip(
+            self._keys,
+            (axis[index] for axis, index in zip(self._axes, self._indexes)),
+        ))
 
     def __iter__(self):
+        # Don't do anything if any list is empty or if all keys are locked.
+        if not all(self._axes) or self._locked_mask == self._all_locked_mask:
+            return
+
         # Take the first step so the while loop below doesn't immediately end
         # because all indexes are zero.
-        # Do not take the first step if any list is empty.
-        if (
-            all(index >= 0 for key, index in self._indexes.items())
-            and any(key not in self._locked_keys for key in self._keys)
-        ):
-            yield self._current_pairs
-            self._advance()
+        yield self._current_pairs
+        self._advance()
 
         # Yield over pairs until all keys are either at their start position 0
-        # again or locked to a specific index. Don't loop at all if any list is
-        # empty (indicated by index == -1, see __init__).
-        while any(index > 0 and key not in self._locked_keys
-                  for key, index in self._indexes.items()):
+        # again or locked to a specific index.
+        while any(index > 0 and not self._locked_mask & (1 << i)
+                  for i, index in enumerate(self._indexes)):
             yield self._current_pairs
             self._advance()
 
     def _advance(self):
-        # Increase the rightmost index or reset it to zero and increase the next
-        # index on the left.
-        for key in reversed(self._keys):
-            if key not in self._locked_keys:
-                if self._indexes[key] < len(self._things[key]) - 1:
-                    self._indexes[key] += 1
+        # Increase the rightmost unlocked index or reset it to zero and increase
+        # the next unlocked index on the left.
+        for i in reversed(range(len(self._keys))):
+            if not self._locked_mask & (1 << i):
+                if self._indexes[i] < len(self._axes[i]) - 1:
+                    self._indexes[i] += 1
                     break
                 else:
-                    self._indexes[key] = 0
-            else:
-                continue
+                    self._indexes[i] = 0
 
     def lock(self, *keys):
         """
@@ -90,7 +84,11 @@ class Combinator(collections.abc.Iterable):
 
         :param keys`: Any key from the `things` mapping from initialization
         """
+        # Don't lock anything if any key is unknown.
+        mask = 0
         for key in keys:
-            if key not in self._keys:
+            index = self._key_index.get(key)
+            if index is None:
                 raise RuntimeError(f'Cannot exclude unknown key: {key!r}')
-        self._locked_keys.update(keys)
+            mask |= 1 << index
+        self._locked_mask |= mask
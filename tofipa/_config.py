@@ -2,6 +2,7 @@ import collections
 import errno
 import os
 import re
+import stat
 
 from xdg.BaseDirectory import xdg_config_home
 
@@ -10,6 +11,10 @@ from . import __project_name__, _errors
 DEFAULT_LOCATIONS_FILEPATH = os.path.join(xdg_config_home, __project_name__, 'locations')
 DEFAULT_CLIENTS_FILEPATH = os.path.join(xdg_config_home, __project_name__, 'clients')
 
+# Valid environment variable name
+# https://stackoverflow.com/a/2821201
+_ENV_VAR_REGEX = re.compile(r'\$([a-zA-Z_]+[a-zA-Z0-9_]*)')
+
 
 class Locations(collections.abc.MutableSequence):
     """
@@ -38,14 +43,13 @@ class Locations(collections.abc.MutableSequence):
         return f'<{type(self).__name__} {self._filepath!r} {self._list!r}>'
 
     def _read(self, filepath):
-        locations = []
-
+        # Yield normalized locations from `filepath`
         try:
             with open(filepath, 'r') as f:
-                for line_number, line in enumerate(f.readlines(), start=1):
+                for line_number, line in enumerate(f, start=1):
                     line = line.strip()
                     if line and not line.startswith('#'):
-                        locations.extend(self._normalize(line, filepath, line_number))
+                        yield from self._normalize(line, filepath, line_number)
         except OSError as e:
             # Ignore missing default config file path
             if e.errno == errno.ENOENT and filepath == DEFAULT_LOCATIONS_FILEPATH:
@@ -54,85 +58,96 @@ class Locations(collections.abc.MutableSequence):
                 msg = e.strerror if e.strerror else str(e)
                 raise _errors.ConfigError(f'Failed to read {filepath}: {msg}')
 
-        return locations
-
     @classmethod
     def _normalize(cls, line, filepath, line_number):
         subdirs = []
 
         if line.endswith(f'{os.sep}*'):
-            # Expand "*"
-            parent_dir = line[:-2]
+            # Expand "*". Environment variables are resolved in the parent
+            # directory. Subdirectory names come from the file system.
+            parent_dir = cls._resolve_env_vars(line[:-2], filepath, line_number)
             try:
-                subdir_names = os.listdir(parent_dir)
+                # DirEntry.is_dir() usually doesn't need another system call.
+                with os.scandir(parent_dir) as entries:
+                    for entry in entries:
+                        # Exclude non-directories (files and exotic stuff like
+                        # sockets), but include nonexisting paths (broken
+                        # symlinks; download locations may not exist anyway)
+                        if entry.is_dir() or not os.path.exists(entry.path):
+                            subdirs.append(entry.path)
             except OSError as e:
                 msg = e.strerror if e.strerror else str(e)
                 raise _errors.ConfigError(f'Failed to read subdirectories from {parent_dir}: {msg}',
                                           filepath=filepath, line_number=line_number)
             else:
-                for name in subdir_names:
-                    subdir_path = os.path.join(parent_dir, name)
-                    # Exclude non-directories (files and exotic stuff like
-                    # sockets), but include nonexisting paths (subdir_path may
-                    # contain unresolved environment variables and download
-                    # locations may not exist anyway)
-                    if os.path.isdir(subdir_path) or not os.path.exists(subdir_path):
-                        subdirs.append(subdir_path)
+                # All paths share the same parent, so this sorts by name.
+                subdirs.sort()
         else:
-            subdirs.append(line)
+            # Resolve environment variables
+            subdir = cls._resolve_env_vars(line, filepath, line_number)
 
-        # Resolve environment variables
-        subdirs = [
-            cls._resolve_env_vars(subdir, filepath, line_number)
-            for subdir in subdirs
-        ]
-
-        # Complain if subdir exists but is not a directory
-        for subdir in subdirs:
-            if os.path.exists(subdir) and not os.path.isdir(subdir):
+            # Complain if subdir exists but is not a directory. Expanded
+            # subdirectories are already filtered above.
+            if cls._is_existing_nondirectory(subdir):
                 raise _errors.ConfigError(f'Not a directory: {subdir}',
                                           filepath=filepath, line_number=line_number)
+            subdirs.append(subdir)
+
+        return subdirs
 
-        return sorted(subdirs)
+    @staticmethod
+    def _is_existing_nondirectory(path):
+        # Same as `os.path.exists(path) and not os.path.isdir(path)` with only
+        # one system call
+        try:
+            return not stat.S_ISDIR(os.stat(path).st_mode)
+        except (OSError, ValueError):
+            return False
 
     @classmethod
     def _resolve_env_vars(cls, line, filepath, line_number):
         # Resolve "~/foo" and "~user/foo"
         path = os.path.expanduser(line)
 
-        while True:
-            # Find valid variable name
-            # https://stackoverflow.com/a/2821201
-            match = re.search(r'\$([a-zA-Z_]+[a-zA-Z0-9_]*)', path)
-            if not match:
-                break
+        environ_get = os.environ.get
+
+        def resolve(match):
+            env_var_name = match.group(1)
+            env_var_value = environ_get(env_var_name, None)
+            if env_var_value is None:
+                raise _errors.ConfigError(f'Unset environment variable: ${env_var_name}',
+                                          filepath=filepath, line_number=line_number)
+            elif env_var_value == '':
+                raise _errors.ConfigError(f'Empty environment variable: ${env_var_name}',
+                                          filepath=filepath, line_number=line_number)
             else:
-                env_var_name = match.group(1)
-                env_var_value = os.environ.get(env_var_name, None)
-                if env_var_value is None:
-                    raise _errors.ConfigError(f'Unset environment variable: ${env_var_name}',
-                                              filepath=filepath, line_number=line_number)
-                elif env_var_value == '':
-                    raise _errors.ConfigError(f'Empty environment variable: ${env_var_name}',
-                                              filepath=filepath, line_number=line_number)
-                else:
-                    path = path.replace(f'${env_var_name}', env_var_value)
-
-        return path
+                return env_var_value
+
+        return _ENV_VAR_REGEX.sub(resolve, path)
 
     def __setitem__(self, index, value):
         # `index` can be int or slice and `value` can be one path or list of
         # paths.
         if not isinstance(value, str) and isinstance(value, collections.abc.Iterable):
-            normalized_paths = []
-            for item in value:
-                for normalized_path in self._normalize(item, None, None):
-                    normalized_paths.append(normalized_path)
-            self._list[index] = normalized_paths
+            self._list[index] = list(self._normalize_many(value))
         else:
             normalized_paths = self._normalize(value, None, None)
             self._list[index] = normalized_paths[0]
 
+    def extend(self, values):
+        # MutableSequence.extend() calls append() for each value, which would
+        # normalize `values` one by one.
+        if values is self:
+            values = list(values)
+        self._list.extend(self._normalize_many(values))
+
+    def _normalize_many(self, values):
+        return (
+            normalized_path
+            for value in values
+            for normalized_path in self._normalize(value, None, None)
+        )
+
     def insert(self, index, value):
         # The only valid type for `index` should be int.
         normalized_paths = self._normalize(value, None, None)
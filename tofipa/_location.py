@@ -1,14 +1,18 @@
 import collections
+import concurrent.futures
+import contextlib
 import difflib
 import errno
-import functools
+import heapq
 import os
+import re
+import stat
 import string
 import tempfile
 
 import torf
 
-from . import __project_name__, _debug
+from . import __project_name__, _debug, _debug_enabled
 from ._combinator import Combinator
 from ._errors import FindError
 
@@ -29,14 +33,25 @@ class FindDownloadLocation:
     def __init__(self, *, torrent, locations, default=None):
         self._torrent_filepath = str(torrent)
         self._torrent = None
-        # Ugly hack to deduplicate locations while preserving order
-        self._locations = tuple(
-            dict.fromkeys(str(loc) for loc in locations)
-        )
+        # Deduplicate locations while preserving order. Locations that resolve
+        # to the same directory (e.g. "foo", "foo/", "./foo" or a symlink to
+        # "foo") are only searched once. The first one is kept as given because
+        # it may be reported as the download location.
+        locations_by_realpath = {}
+        for location in locations:
+            location = str(location)
+            locations_by_realpath.setdefault(os.path.realpath(location), location)
+        self._locations = tuple(locations_by_realpath.values())
         if len(self._locations) < 1:
             raise RuntimeError('You must provide at least one potential download location')
         self._default_location = str(default) if default else None
         self._found_files = set()
+        # Map file paths to os.stat_result or `None` if stat() failed
+        self._stat_cache = {}
+        # Map (piece index, existing files in piece) to verify_piece() result
+        self._piece_cache = {}
+        # (source directory, target directory) tuples on different file systems
+        self._cross_device_directories = set()
 
     def find(self):
         try:
@@ -60,34 +75,58 @@ class FindDownloadLocation:
         links_to_create = {}
         download_location = None
 
+        # torf.Torrent.files creates a new list of torf.File objects on every
+        # access.
+        torrent_files = frozenset(self._torrent.files)
+        torrent_files_count = len(torrent_files)
+        torrent_name = self._torrent.name
+
         # `paths` maps relative file paths expected by torrent to a candidate
         # dictionary from `candidates`.
+        #
+        # Files are verified with a complete combination of candidates because
+        # a piece can overlap neighbouring files. Verifying one file before its
+        # neighbours are linked could reject a good candidate. Combinations are
+        # pruned by locking found files in _each_set_of_linked_candidates().
         for paths in self._each_set_of_linked_candidates(candidates):
-            _debug('%d / %d files', len(links_to_create), len(self._torrent.files))
-            for file, candidate in paths.items():
-                if file not in links_to_create:
-                    if self._verify_file(file, location=candidate['temporary_location']):
-                        # Use download location of first matching file.
-                        if download_location is None:
-                            _debug('Setting download location: %r', candidate['location'])
-                            download_location = candidate['location']
-
-                        _debug('  %s: Using %r', file, candidate['filepath'])
-                        links_to_create[file] = (candidate['filepath'], os.path.join(download_location, file))
-
-                        # Maintain a list of files we already found.
-                        # _each_set_of_linked_candidates() uses that list to
-                        # skip new combinations of files that are now
-                        # irrelevant.
-                        _debug('  Found files: %r', self._found_files)
-                        self._found_files.add(file)
-
+            _debug('%d / %d files', len(links_to_create), torrent_files_count)
+
+            # All candidates are linked in the same temporary directory, so they
+            # can share one TorrentFileStream. It is only opened if any file
+            # still needs verifying.
+            location = next(iter(paths.values()))['temporary_location']
+            content_path = os.path.join(location, torrent_name)
+            with contextlib.ExitStack() as exit_stack:
+                tfs = None
+                for file, candidate in paths.items():
+                    if file not in links_to_create:
+                        if tfs is None:
+                            tfs = exit_stack.enter_context(
+                                torf.TorrentFileStream(self._torrent, content_path=content_path)
+                            )
+
+                        if self._verify_file(file, tfs=tfs, location=location):
+                            # Use download location of first matching file.
+                            if download_location is None:
+                                _debug('Setting download location: %r', candidate['location'])
+                                download_location = candidate['location']
+
+                            _debug('  %s: Using %r', file, candidate['filepath'])
+                            links_to_create[file] = (candidate['filepath'], os.path.join(download_location, file))
+
+                            # Maintain a list of files we already found.
+                            # _each_set_of_linked_candidates() uses that list
+                            # to skip new combinations of files that are now
+                            # irrelevant.
+                            _debug('  Found files: %r', self._found_files)
+                            self._found_files.add(file)
+
+                        else:
+                            _debug('  %s: Not using %r', file, candidate['filepath'])
                     else:
-                        _debug('  %s: Not using %r', file, candidate['filepath'])
-                else:
-                    _debug('  %s: Already found %r', file, links_to_create[file][0])
+                        _debug('  %s: Already found %r', file, links_to_create[file][0])
 
-            if all(file in links_to_create for file in self._torrent.files):
+            if links_to_create.keys() >= torrent_files:
                 _debug('All files found: %r', tuple(links_to_create))
                 break
 
@@ -98,178 +137,436 @@ class FindDownloadLocation:
         return download_location
 
     def _each_set_of_linked_candidates(self, candidates):
-        _debug('Iterating over combinations of temporary symlinks:')
-        for file, cands in sorted(candidates.items()):
-            _debug('  * %s -> %s', [c['filepath'] for c in cands], file)
+        if _debug_enabled():
+            _debug('Iterating over combinations of temporary symlinks:')
+            for file, cands in sorted(candidates.items()):
+                _debug('  * %s -> %s', [c['filepath'] for c in cands], file)
+
+        # Map candidate file paths to absolute file paths (link sources).
+        sources = {
+            candidate['filepath']: os.path.abspath(candidate['filepath'])
+            for cands in candidates.values()
+            for candidate in cands
+        }
 
         combinator = Combinator(candidates)
-        for pairs in combinator:
-            with self._temporary_directory as location:
+        with self._temporary_directory as location:
+            # Map relative file paths expected by torrent to currently linked
+            # candidate.
+            linked_candidates = {}
+            for pairs in combinator:
                 # Create temporary links as they are expected by the torrent.
+                # Combinator usually only changes the last few files, so only
+                # replace links that are different from the previous
+                # combination.
                 for file, candidate in pairs:
-                    candidate['temporary_location'] = location
-                    source = os.path.abspath(candidate['filepath'])
-                    target = os.path.join(location, file)
-                    self._create_symlink(source, target)
+                    if linked_candidates.get(file) is not candidate:
+                        candidate['temporary_location'] = location
+                        source = sources[candidate['filepath']]
+                        target = os.path.join(location, file)
+                        if file in linked_candidates:
+                            self._remove_symlink(target)
+                        self._create_symlink(source, target)
+                        linked_candidates[file] = candidate
 
                 # Map torrent file path to other relevant information that is
                 # needed for matching.
-                yield {file: candidate for file, candidate in pairs}
+                yield dict(pairs)
 
                 # Do not iterate over new combinations of files we already
                 # found.
-                combinator.lock(*sorted(self._found_files))
+                combinator.lock(*self._found_files)
 
-            # Ensure temporary links are removed.
-            assert not os.path.exists(location), location
+        # Ensure temporary links are removed.
+        assert not os.path.exists(location), location
 
-    def _verify_file(self, file, location):
+    def _verify_file(self, file, tfs, location):
+        # `tfs` is a TorrentFileStream that reads from `location`.
         _debug('  Verifying %s at %s', file, location)
-        content_path = os.path.join(location, self._torrent.name)
-        with torf.TorrentFileStream(self._torrent, content_path=content_path) as tfs:
-            # Don't check the first and the last piece of a file as they likely
-            # overlap with another file that might be either invalid or missing.
-            file_piece_indexes = tfs.get_absolute_piece_indexes(file, (1, -2))
-            _debug('    Verifying pieces: %r', file_piece_indexes)
-            for piece_index in file_piece_indexes:
-                piece_ok = tfs.verify_piece(piece_index)
-                if piece_ok is True:
-                    _debug('    Piece %d is valid', piece_index)
-                elif piece_ok is False:
-                    _debug('    Piece %d is invalid', piece_index)
-                    return False
-                elif piece_ok is None:
-                    _debug('    Piece %d is unverifiable; probably non-existing file', piece_index)
-                    return None
+        # Don't check the first and the last piece of a file as they likely
+        # overlap with another file that might be either invalid or missing.
+        file_piece_indexes = tfs.get_absolute_piece_indexes(file, (1, -2))
+        _debug('    Verifying pieces: %r', file_piece_indexes)
+        # Look at cached results first so we don't hash any pieces if another
+        # piece is already known to be invalid.
+        piece_keys = [
+            self._get_piece_key(tfs, piece_index, location)
+            for piece_index in file_piece_indexes
+        ]
+        piece_keys.sort(key=lambda piece_key: piece_key not in self._piece_cache)
+        for piece_key in piece_keys:
+            piece_index = piece_key[0]
+            piece_ok = self._verify_piece(tfs, piece_key)
+            if piece_ok is True:
+                _debug('    Piece %d is valid', piece_index)
+            elif piece_ok is False:
+                _debug('    Piece %d is invalid', piece_index)
+                return False
+            elif piece_ok is None:
+                _debug('    Piece %d is unverifiable; probably non-existing file', piece_index)
+                return None
         return True
 
+    def _get_piece_key(self, tfs, piece_index, location):
+        # The same existing files are linked to many temporary locations, so
+        # piece results are cached for the files the temporary links point to.
+        # All files in the piece are part of the key because a piece can
+        # overlap multiple files.
+        return (piece_index, tuple(
+            os.path.realpath(os.path.join(location, file))
+            for file in tfs.get_files_at_piece_index(piece_index)
+        ))
+
+    def _verify_piece(self, tfs, piece_key):
+        try:
+            return self._piece_cache[piece_key]
+        except KeyError:
+            piece_ok = self._piece_cache[piece_key] = tfs.verify_piece(piece_key[0])
+            return piece_ok
+
     def _get_size_matching_candidates(self):
-        # Map each relative file path from the torrent to a list of candidates.
-        # A candidate is a dictionary that stores information about a file from
-        # the file system that has the expected size.
+        # Map each relative file path from the torrent to a min-heap of the best
+        # candidates so far. Heap items are (similarity, -number, candidate)
+        # tuples. `number` increases with every found file so that, among
+        # candidates with the same similarity, the most recently found one is
+        # evicted first. A candidate is a dictionary that stores information
+        # about a file from the file system that has the expected size.
         candidates = collections.defaultdict(lambda: [])
-        torrent_files = tuple(self._torrent.files)
-        for filepath, location in self._each_file(*self._locations):
-            for file in torrent_files:
-                if self._is_size_match(file, filepath):
-                    filepath_rel = filepath[len(location):].lstrip(os.sep)
-
-                    def get_similarity(filepath_fs, filepath_torrent=str(file)):
-                        return self._get_path_similarity(filepath_fs, filepath_torrent)
-
-                    # Candidates are dictionaries:
-                    #         file: torf.File object (relative file path in torrent)
-                    #     location: Download path to pass to the BitTorrent
-                    #               client along with the torrent file
-                    #     filepath: Existing file path with same size as `file`
-                    # filepath_rel: `filepath` without `location`
-                    #               (`location` / `filepath` is the same as `filepath`)
-                    #   similarity: How close `file` is to `filepath_rel` as
-                    #               float from 0.0 to 1.0
-                    candidates[file].append({
-                        'location': location,
-                        'filepath': filepath,
-                        'filepath_rel': filepath_rel,
-                        'similarity': get_similarity(filepath_rel),
-                    })
-
-        # Sort size-matching files by file path similarity.
-        for file in candidates:
-            candidates[file].sort(key=lambda c: c['similarity'], reverse=True)
-
-            _debug('Size matches for %r', file)
-            for cand in candidates[file]:
-                _debug(' * %s [%.2f]', cand['filepath'], cand['similarity'])
-
-            # Keep only the three best matches.
-            del candidates[file][3:]
-
-        return dict(candidates)
+
+        # Map file sizes to files from the torrent so we don't have to compare
+        # every torrent file to every existing file. Existing files are not
+        # stored unless they match the size of a torrent file.
+        torrent_files = self._torrent.files
+        torrent_files_by_size = collections.defaultdict(lambda: [])
+        for file in torrent_files:
+            torrent_files_by_size[file.size].append(file)
+
+        # Map torrent files to SequenceMatcher instances that are created on
+        # first size match.
+        path_matchers = {}
+
+        each_file = self._each_file(*self._locations, sizes=frozenset(torrent_files_by_size))
+        for number, (filepath, location, size) in enumerate(each_file):
+            size_matching_files = torrent_files_by_size.get(size, None)
+            if not size_matching_files:
+                continue
+
+            # `filepath` is `location` or os.path.join()ed beneath it, so there
+            # is at most one separator between them.
+            filepath_rel = filepath[len(location):]
+            if filepath_rel.startswith(os.sep):
+                filepath_rel = filepath_rel[len(os.sep):]
+
+            for file in size_matching_files:
+                filepath_torrent = str(file)
+                file_candidates = candidates[file]
+
+                # Don't compute similarity if it can't beat the worst of the
+                # best candidates. Earlier candidates win ties. Upper bounds are
+                # checked from cheapest to most expensive.
+                if len(file_candidates) >= self._max_candidates:
+                    threshold = file_candidates[0][0]
+                else:
+                    threshold = -1.0
+
+                if self._get_path_similarity_limit(filepath_rel, filepath_torrent) <= threshold:
+                    continue
+                elif filepath_rel == filepath_torrent:
+                    similarity = 1.0
+                else:
+                    try:
+                        path_matcher = path_matchers[file]
+                    except KeyError:
+                        path_matcher = path_matchers[file] = self._get_path_matcher(filepath_torrent)
+                    path_matcher.set_seq1(filepath_rel)
+                    if path_matcher.quick_ratio() <= threshold:
+                        continue
+                    similarity = path_matcher.ratio()
+
+                # Candidates are dictionaries:
+                #         file: torf.File object (relative file path in torrent)
+                #     location: Download path to pass to the BitTorrent
+                #               client along with the torrent file
+                #     filepath: Existing file path with same size as `file`
+                # filepath_rel: `filepath` without `location`
+                #               (`location` / `filepath` is the same as `filepath`)
+                #   similarity: How close `file` is to `filepath_rel` as
+                #               float from 0.0 to 1.0
+                candidate = {
+                    'location': location,
+                    'filepath': filepath,
+                    'filepath_rel': filepath_rel,
+                    'similarity': similarity,
+                }
+                item = (similarity, -number, candidate)
+                if len(file_candidates) >= self._max_candidates:
+                    heapq.heappushpop(file_candidates, item)
+                else:
+                    heapq.heappush(file_candidates, item)
+
+        # Sort best matches by file path similarity. Candidates with equal
+        # similarity stay in the order they were found. Files stay in the order
+        # their first candidate was found in because _get_download_location()
+        # uses the location of the first verified file.
+        best_candidates = {}
+        for file, file_candidates in candidates.items():
+            best_candidates[file] = [
+                candidate
+                for _, _, candidate in sorted(file_candidates, key=lambda item: item[:2], reverse=True)
+            ]
+
+            if _debug_enabled():
+                _debug('Size matches for %r', file)
+                for cand in best_candidates[file]:
+                    _debug(' * %s [%.2f]', cand['filepath'], cand['similarity'])
+
+        return best_candidates
+
+    # Maximum number of candidates per file in the torrent
+    _max_candidates = 3
 
     @staticmethod
-    def _get_path_similarity(a, b, _is_junk=lambda x: x in '. -/'):
-        return difflib.SequenceMatcher(_is_junk, a, b, autojunk=False).ratio()
-
-    def _each_file(self, *paths):
-        # Yield (filepath, path) tuples where the first item is a file (more
-        # specifically: a non-directory) beneath the second item. The second
-        # item is a path from `paths`. If there is a file path in `paths`, it is
-        # yielded as both items of the tuple.
-        for path in paths:
-            _debug('Searching %s', path)
-            if not os.path.isdir(path):
-                yield (str(path), str(path))
-            else:
-                for root, dirnames, filenames in os.walk(path, followlinks=True):
-                    for filename in filenames:
-                        yield (str(os.path.join(root, filename)), str(path))
+    def _get_path_similarity_limit(a, b):
+        # Return upper bound of SequenceMatcher.ratio(), which can't be higher
+        # than the ratio of the path lengths (see
+        # SequenceMatcher.real_quick_ratio()).
+        length = len(a) + len(b)
+        if length:
+            return 2.0 * min(len(a), len(b)) / length
+        return 1.0
 
-    @functools.lru_cache(maxsize=None)
-    def _is_size_match(self, torrentfile, filepath):
-        # Return whether a file in a torrent and an existing file are the same
-        # size.
-        return torrentfile.size == self._get_file_size(filepath)
+    @staticmethod
+    def _get_path_matcher(filepath_torrent, _is_junk=lambda x: x in '. -/'):
+        # Return SequenceMatcher that compares `filepath_torrent` to the path
+        # from set_seq1(). SequenceMatcher only analyzes its second sequence
+        # once, so the same matcher should be used for all paths that are
+        # compared to `filepath_torrent`.
+        return difflib.SequenceMatcher(_is_junk, b=filepath_torrent, autojunk=False)
+
+    def _each_file(self, *paths, sizes=None):
+        # Yield (filepath, path, size) tuples where the first item is a regular
+        # file beneath the second item (see _walk()) and the third item is the
+        # file's size or `None` if it can't be determined. The second item is a
+        # path from `paths`. If there is a file path in `paths`, it is yielded
+        # as both items of the tuple. If `sizes` is not `None`, only files with
+        # a size in `sizes` are yielded.
+        paths = [str(path) for path in paths]
+        if len(paths) <= 1:
+            for path in paths:
+                _debug('Searching %s', path)
+                for filepath, size in self._walk(path, sizes):
+                    yield (filepath, path, size)
+            return
+
+        # Walking a directory tree mostly waits for system calls, which release
+        # the GIL, so walking each path in its own thread is faster, especially
+        # if paths are on different devices. The number of CPUs doesn't matter
+        # because the threads are I/O-bound.
+        max_workers = min(len(paths), self._max_walkers)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            for path in paths:
+                _debug('Searching %s', path)
+                futures.append(executor.submit(self._walk, path, sizes))
+            for path, future in zip(paths, futures):
+                for filepath, size in future.result():
+                    yield (filepath, path, size)
+
+    # Maximum number of paths that are walked concurrently
+    _max_walkers = 8
+
+    def _walk(self, path, sizes=None):
+        # Return list of (filepath, size) tuples of all regular files beneath
+        # `path` or `path` itself if it is not a directory. `size` is `None` if
+        # it can't be determined. Broken symlinks and exotic stuff like sockets
+        # and FIFOs beneath `path` are ignored. If `sizes` is not `None`, files
+        # with a size that is not in `sizes` are ignored.
+
+        # Use the same stat() result to check for directory and get file size.
+        stat_result = self._get_stat(path)
+        if stat_result is None or not stat.S_ISDIR(stat_result.st_mode):
+            size = self._get_file_size(path)
+            if sizes is None or size in sizes:
+                return [(path, size)]
+            return []
+
+        # DirEntry caches the file type from reading the directory and the
+        # stat() result, so each file needs at most one system call. Like
+        # os.walk(topdown=True, followlinks=True), files are found in the same
+        # order, symlinks to directories are followed and unreadable
+        # directories are ignored.
+        files = []
+        dirpaths = [path]
+        while dirpaths:
+            dirpath = dirpaths.pop()
+            with contextlib.ExitStack() as exit_stack:
+                try:
+                    entries = exit_stack.enter_context(self._scandir(dirpath))
+                except OSError:
+                    continue
+
+                subdirpaths = []
+                while True:
+                    try:
+                        entry = next(entries)
+                    except StopIteration:
+                        break
+                    except OSError:
+                        # Reading the directory failed. Keep what we've got.
+                        break
+
+                    entry_path = os.path.join(dirpath, entry.name)
+                    try:
+                        if entry.is_dir():
+                            subdirpaths.append(entry_path)
+                        elif entry.is_file():
+                            size = self._get_entry_size(entry)
+                            if sizes is None or size in sizes:
+                                files.append((entry_path, size))
+                    except OSError:
+                        # File type can't be determined
+                        continue
+
+            # Walk subdirectories depth-first in the order they were listed.
+            dirpaths.extend(reversed(subdirpaths))
+        return files
 
-    def _get_file_size(self, filepath):
-        # os.path.getsize("path/to/directory") returns 4096
-        if not os.path.isdir(filepath):
+    @staticmethod
+    def _get_entry_size(entry):
+        # Return size of os.DirEntry or `None` if it can't be determined
+        try:
+            return entry.stat().st_size
+        except OSError:
+            return None
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _scandir(dirpath):
+        # Context manager that provides os.scandir() iterator for `dirpath`. If
+        # possible, `dirpath` is opened as a file descriptor so that DirEntry
+        # system calls are relative to it and don't resolve `dirpath` again.
+        # O_DIRECTORY makes open() fail if `dirpath` was replaced with a file.
+        if os.scandir in os.supports_fd:
+            dir_fd = os.open(dirpath, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
             try:
-                return os.path.getsize(filepath)
+                with os.scandir(dir_fd) as entries:
+                    yield entries
+            finally:
+                os.close(dir_fd)
+        else:
+            with os.scandir(dirpath) as entries:
+                yield entries
+
+    def _get_stat(self, path):
+        # Return cached os.stat() result or `None` if it failed
+        try:
+            return self._stat_cache[path]
+        except KeyError:
+            try:
+                stat_result = os.stat(path)
             except OSError:
-                pass
+                stat_result = None
+            self._stat_cache[path] = stat_result
+            return stat_result
+
+    def _get_file_size(self, filepath):
+        stat_result = self._get_stat(filepath)
+
+        # Directory size is not the combined size of its contents
+        if stat_result is not None and not stat.S_ISDIR(stat_result.st_mode):
+            return stat_result.st_size
         return None
 
     def _create_hardlink(self, source, target):
         return self._create_link(self._hardlink_or_symlink, source, target)
 
     def _hardlink_or_symlink(self, source, target):
-        # Try hard link and default to symlink.
-        try:
-            os.link(source, target)
-        except OSError as e:
-            if e.errno == errno.EXDEV:
-                # Invalid cross-device link (`source` and `target` are on
-                # different file systems)
-                os.symlink(source, target)
-            else:
-                raise
+        # Try hard link and default to symlink. A file is on the same file
+        # system as its parent directory, so we don't have to try hard linking
+        # between the same directories again.
+        directories = (os.path.dirname(source), os.path.dirname(target))
+        if directories in self._cross_device_directories:
+            os.symlink(source, target)
+        else:
+            try:
+                os.link(source, target)
+            except OSError as e:
+                if e.errno == errno.EXDEV:
+                    # Invalid cross-device link (`source` and `target` are on
+                    # different file systems)
+                    self._cross_device_directories.add(directories)
+                    os.symlink(source, target)
+                else:
+                    raise
 
     def _create_symlink(self, source, target):
         return self._create_link(os.symlink, source, target)
 
     def _create_link(self, create_link_function, source, target):
-        if not os.path.exists(target):
-            # Create parent directory if it doesn't exist.
+        # Create link. Don't check if `target` exists beforehand because it
+        # usually doesn't.
+        _debug('%s(%r, %r)', create_link_function.__qualname__, source, target)
+        try:
+            self._create_link_and_parent_directory(create_link_function, source, target)
+        except OSError as e:
+            # Existing `target` is fine unless it is a broken symlink.
+            if isinstance(e, FileExistsError) and os.path.exists(target):
+                _debug('Already exists: %r', target)
+            else:
+                msg = e.strerror if e.strerror else e
+                raise FindError(f'Failed to link {source} to {target}: {msg}')
+
+    def _create_link_and_parent_directory(self, create_link_function, source, target):
+        # Create parent directory only if linking fails because it doesn't
+        # exist. This saves a system call per link in the usual case.
+        try:
+            create_link_function(source, target)
+        except FileNotFoundError:
             target_parent = os.path.dirname(target)
+            if os.path.isdir(target_parent):
+                # `source` doesn't exist
+                raise
+
             try:
                 os.makedirs(target_parent, exist_ok=True)
             except OSError as e:
                 msg = e.strerror if e.strerror else e
                 raise FindError(f'Failed to create directory {target_parent}: {msg}')
-            else:
-                # Create link.
-                _debug(f'{create_link_function.__qualname__}({source!r}, {target!r})')
-                try:
-                    create_link_function(source, target)
-                except OSError as e:
-                    msg = e.strerror if e.strerror else e
-                    raise FindError(f'Failed to link {source} to {target}: {msg}')
-        else:
-            _debug('Already exists: %r', target)
+
+            create_link_function(source, target)
+
+    def _remove_symlink(self, target):
+        _debug('Removing %r', target)
+        try:
+            os.unlink(target)
+        except OSError as e:
+            msg = e.strerror if e.strerror else e
+            raise FindError(f'Failed to remove {target}: {msg}')
 
     @property
     def _temporary_directory(self):
         # Avoid illegal characters.
-        name = ''.join(
-            c if c in self._allowed_filename_characters else '_'
-            for c in self._torrent.name
-        )
+        name = self._illegal_filename_characters_regex.sub('_', self._torrent.name)
         # TemporaryDirectory is a context manager that automatically deletes the
         # directory when leaving the context.
-        return tempfile.TemporaryDirectory(prefix=f'{__project_name__}.{name}.')
+        return tempfile.TemporaryDirectory(
+            prefix=f'{__project_name__}.{name}.',
+            dir=self._get_temporary_directory_parent(),
+        )
+
+    @staticmethod
+    def _get_temporary_directory_parent(_ramfs_path='/dev/shm'):
+        # The temporary directory only contains symlinks. Prefer a RAM-backed
+        # file system unless the user specified a temporary directory. `None`
+        # means tempfile picks the directory.
+        if not any(os.environ.get(name) for name in ('TMPDIR', 'TEMP', 'TMP')):
+            if os.path.isdir(_ramfs_path) and os.access(_ramfs_path, os.W_OK):
+                return _ramfs_path
+        return None
 
     _allowed_filename_characters = (
         string.ascii_letters
         + string.digits
         + " ',.-"
     )
+    _illegal_filename_characters_regex = re.compile(f'[^{re.escape(_allowed_filename_characters)}]')